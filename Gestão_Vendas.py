@@ -18,6 +18,7 @@ import tkinter as tk
 from tkinter import messagebox, ttk, END, BOTH, YES, X, LEFT, HORIZONTAL, filedialog
 import os
 import sys
+from pathlib import Path
 from ttkbootstrap import Style
 import ttkbootstrap as ttk_bootstrap
 from ttkbootstrap.constants import *
@@ -26,15 +27,18 @@ from ttkbootstrap.tooltip import ToolTip
 from ttkbootstrap.scrolled import ScrolledFrame # Usado na Calculadora
 from datetime import datetime
 import subprocess
+import shutil
 import ctypes
-import openpyxl
 import threading
+import math
+from operator import itemgetter
 import json # Usado na Calculadora
 
 # Importações para a nova aba de Dashboard
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
+# openpyxl (histórico da calculadora) e xlsxwriter (exportação) são importados
+# apenas quando usados: a maioria das sessões não chega a precisar deles.
 
 
 # --- Função para encontrar o caminho dos arquivos (essencial para o PyInstaller) ---
@@ -48,6 +52,27 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 
+# --- Formatação de números no padrão brasileiro ---
+# Tabelas para str.translate: trocam os separadores numa única passada,
+# sem encadear vários replace() a cada valor formatado.
+_DOT_TO_COMMA = str.maketrans(".", ",")
+_PT_BR_SEPARADORES = str.maketrans(",.", ".,") # 1,234.50 -> 1.234,50
+_COMMA_TO_DOT = str.maketrans(",", ".")
+
+# --- Plataforma (avaliada uma única vez; usada nos trechos específicos do Windows) ---
+_IS_WINDOWS = os.name == 'nt'
+
+
+def _parse_valor(texto):
+    """Converte um valor digitado com vírgula decimal (ex.: '12,50') em float."""
+    return float(texto.translate(_COMMA_TO_DOT))
+
+
+def _fmt_decimal(valor):
+    """Formata um número (valor em R$ ou percentual) com duas casas e vírgula decimal (vazio para None)."""
+    return '' if valor is None else format(valor, '.2f').translate(_DOT_TO_COMMA)
+
+
 # --- Classe para Gerenciamento do Banco de Dados ---
 class DatabaseManager:
     """
@@ -55,10 +80,22 @@ class DatabaseManager:
     Responsável por inicializar o DB e todas as operações CRUD para
     vendas, encomendas e anotações.
     """
+    # Consultas de vendas montadas uma única vez: o cache de statements do sqlite3
+    # é indexado pelo texto do SQL, então o mesmo texto reaproveita o plano já preparado.
+    SQL_SELECT_SALES = "SELECT id, data_hora, nome_cliente, nome_produto, quantidade, preco, tipo_pagamento, preco_final, nome_vendedor FROM vendas"
+    SQL_FETCH_SALE_BY_ID = "SELECT id, nome_cliente, nome_produto, quantidade, preco, tipo_pagamento, nome_vendedor FROM vendas WHERE id=?"
+    # Extrai do dicionário de uma venda os valores na ordem das colunas de gravação
+    SALE_VALUES = itemgetter("nome_cliente", "nome_produto", "quantidade", "preco",
+                             "tipo_pagamento", "preco_final", "nome_vendedor", "data_hora")
+    # Quantos termos de busca distintos têm o total guardado (cada letra digitada gera um)
+    TOTAIS_CACHE_MAX = 32
+
     def __init__(self, db_path):
         self.db_path = db_path
         self.conn = None
         self.cursor = None
+        # termo de busca -> SUM(preco_final); esvaziado a cada gravação em 'vendas'
+        self._totais_cache = {}
         self._initialize_db()
 
     def _initialize_db(self):
@@ -67,8 +104,17 @@ class DatabaseManager:
         Oculta o arquivo do banco de dados no Windows.
         """
         try:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False) # Habilita para threads
+            # check_same_thread=False habilita o uso por threads; cached_statements maior mantém
+            # preparadas as consultas de pesquisa/total/paginação além das de CRUD.
+            self.conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256)
             self.cursor = self.conn.cursor()
+            # WAL + synchronous=NORMAL: cada commit deixa de forçar um fsync do arquivo
+            # principal, o que acelera muito as gravações pequenas e frequentes.
+            self.cursor.execute("PRAGMA journal_mode=WAL")
+            self.cursor.execute("PRAGMA synchronous=NORMAL")
+            self.cursor.execute("PRAGMA temp_store=MEMORY") # Ordenações temporárias sem arquivo
+            self.cursor.execute("PRAGMA cache_size=-20000") # ~20 MB de cache de páginas
+            self.cursor.execute("PRAGMA mmap_size=134217728") # Leituras via mmap (até 128 MB)
             
             # 1. Cria a tabela 'vendas'
             self.cursor.execute("""
@@ -108,10 +154,14 @@ class DatabaseManager:
             # Garante que a linha de anotações exista
             self.cursor.execute("INSERT OR IGNORE INTO anotacoes (id, conteudo) VALUES (1, '')")
 
+            # 4. Índice de texto completo para a pesquisa de vendas
+            self.fts_enabled = self._setup_fts()
+
             self.conn.commit()
 
-            # Ocultar o arquivo do banco de dados (específico para Windows)
-            if os.name == 'nt' and os.path.exists(self.db_path):
+            # Ocultar o arquivo do banco de dados (específico para Windows).
+            # O connect acima já criou o arquivo, então não é preciso checar se ele existe.
+            if _IS_WINDOWS:
                 try:
                     ctypes.windll.kernel32.SetFileAttributesW(self.db_path, 0x02) # Atributo HIDDEN
                 except Exception as e:
@@ -121,72 +171,177 @@ class DatabaseManager:
             messagebox.showerror("Erro de Banco de Dados", f"Erro ao inicializar: {e}")
             exit()
 
+    def _setup_fts(self):
+        """
+        Cria a tabela virtual FTS5 'vendas_fts' (tokenizador trigram, que permite buscar
+        trechos no meio das palavras, como o LIKE '%termo%') e os triggers que a mantêm
+        sincronizada com 'vendas'. Retorna False se o SQLite não tiver suporte a FTS5/trigram;
+        nesse caso a pesquisa continua usando LIKE.
+        """
+        try:
+            self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='vendas_fts'")
+            ja_existia = self.cursor.fetchone() is not None
+
+            self.cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS vendas_fts USING fts5(
+                nome_cliente, nome_produto, nome_vendedor,
+                content='vendas', content_rowid='id', tokenize='trigram'
+            )
+            """)
+            self.cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS vendas_fts_ai AFTER INSERT ON vendas BEGIN
+                INSERT INTO vendas_fts (rowid, nome_cliente, nome_produto, nome_vendedor)
+                VALUES (new.id, new.nome_cliente, new.nome_produto, new.nome_vendedor);
+            END
+            """)
+            self.cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS vendas_fts_ad AFTER DELETE ON vendas BEGIN
+                INSERT INTO vendas_fts (vendas_fts, rowid, nome_cliente, nome_produto, nome_vendedor)
+                VALUES ('delete', old.id, old.nome_cliente, old.nome_produto, old.nome_vendedor);
+            END
+            """)
+            self.cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS vendas_fts_au AFTER UPDATE ON vendas BEGIN
+                INSERT INTO vendas_fts (vendas_fts, rowid, nome_cliente, nome_produto, nome_vendedor)
+                VALUES ('delete', old.id, old.nome_cliente, old.nome_produto, old.nome_vendedor);
+                INSERT INTO vendas_fts (rowid, nome_cliente, nome_produto, nome_vendedor)
+                VALUES (new.id, new.nome_cliente, new.nome_produto, new.nome_vendedor);
+            END
+            """)
+
+            # Bancos criados antes do índice: indexa as vendas já existentes
+            if not ja_existia:
+                self.cursor.execute("INSERT INTO vendas_fts (vendas_fts) VALUES ('rebuild')")
+            return True
+        except sqlite3.OperationalError as e:
+            print(f"Pesquisa de texto completo indisponível, usando LIKE: {e}")
+            return False
+
     # --- Métodos para Vendas ---
-    def insert_sale(self, data):
-        """Insere uma nova venda no banco de dados."""
+    def upsert_sale(self, data, sale_id=None):
+        """
+        Insere uma nova venda (sale_id=None) ou atualiza a venda existente, numa única instrução.
+        Retorna o ID da venda gravada, ou None em caso de erro.
+        Usa ON CONFLICT ... DO UPDATE em vez de INSERT OR REPLACE: o REPLACE apagaria a linha
+        sem disparar os triggers de exclusão, deixando o índice de pesquisa dessincronizado.
+        """
         try:
             self.cursor.execute("""
-            INSERT INTO vendas (nome_cliente, nome_produto, quantidade, preco, tipo_pagamento, preco_final, nome_vendedor, data_hora)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (data["nome_cliente"], data["nome_produto"], data["quantidade"], data["preco"],
-                  data["tipo_pagamento"], data["preco_final"], data["nome_vendedor"], data["data_hora"]))
+            INSERT INTO vendas (id, nome_cliente, nome_produto, quantidade, preco, tipo_pagamento, preco_final, nome_vendedor, data_hora)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                nome_cliente=excluded.nome_cliente, nome_produto=excluded.nome_produto,
+                quantidade=excluded.quantidade, preco=excluded.preco,
+                tipo_pagamento=excluded.tipo_pagamento, preco_final=excluded.preco_final,
+                nome_vendedor=excluded.nome_vendedor, data_hora=excluded.data_hora
+            """, (sale_id, *self.SALE_VALUES(data)))
             self.conn.commit()
+            self._totais_cache.clear()
+            return sale_id if sale_id is not None else self.cursor.lastrowid
         except sqlite3.Error as e:
             self.conn.rollback()
-            messagebox.showerror("Erro de Banco de Dados", f"Erro ao inserir venda: {e}")
+            messagebox.showerror("Erro de Banco de Dados", f"Erro ao salvar venda: {e}")
+            return None
     
     def insert_multiple_sales(self, sales_data_list):
-        """Insere múltiplas vendas em uma única transação."""
+        """Insere múltiplas vendas em uma única transação.
+
+        Em caso de erro desfaz a transação e propaga o sqlite3.Error: o método roda
+        na thread de importação, que não pode abrir diálogos do Tk diretamente.
+        """
         try:
             self.cursor.executemany("""
             INSERT INTO vendas (nome_cliente, nome_produto, quantidade, preco, tipo_pagamento, preco_final, nome_vendedor, data_hora)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """, sales_data_list)
             self.conn.commit()
-            return True
-        except sqlite3.Error as e:
+        except sqlite3.Error:
             self.conn.rollback()
-            messagebox.showerror("Erro de Banco de Dados", f"Erro ao inserir múltiplas vendas: {e}")
-            return False
+            raise
+        finally:
+            # Roda fora da thread da interface: invalida também se a UI somou no meio da transação
+            self._totais_cache.clear()
 
-    def update_sale(self, sale_id, data):
-        """Atualiza uma venda existente."""
+    def delete_sales_bulk(self, sale_ids):
+        """Exclui várias vendas numa única transação (um único commit para toda a seleção)."""
         try:
-            self.cursor.execute("""
-            UPDATE vendas
-            SET nome_cliente=?, nome_produto=?, quantidade=?, preco=?, tipo_pagamento=?, preco_final=?, nome_vendedor=?, data_hora=?
-            WHERE id=?
-            """, (data["nome_cliente"], data["nome_produto"], data["quantidade"], data["preco"],
-                  data["tipo_pagamento"], data["preco_final"], data["nome_vendedor"], data["data_hora"], sale_id))
-            self.conn.commit()
-        except sqlite3.Error as e:
-            self.conn.rollback()
-            messagebox.showerror("Erro de Banco de Dados", f"Erro ao atualizar venda: {e}")
-
-    def delete_sale(self, sale_id):
-        """Exclui uma venda pelo ID."""
-        try:
-            self.cursor.execute("DELETE FROM vendas WHERE id=?", (sale_id,))
+            self._delete_ids("vendas", sale_ids)
             self.conn.commit()
+            self._totais_cache.clear()
+            return True
         except sqlite3.Error as e:
             self.conn.rollback()
-            messagebox.showerror("Erro de Banco de Dados", f"Erro ao excluir venda: {e}")
+            messagebox.showerror("Erro de Banco de Dados", f"Erro ao excluir vendas: {e}")
+            return False
 
-    def fetch_all_sales(self, search_term=""):
-        """Busca todas as vendas, opcionalmente filtrando por um termo de busca."""
+    def _delete_ids(self, table, ids):
+        """Executa DELETE ... WHERE id IN (...) em lotes, sem commit (a transação é do chamador)."""
+        ids = list(ids)
+        # Lotes abaixo do limite de parâmetros por comando do SQLite (999 em versões antigas)
+        for start in range(0, len(ids), 900):
+            chunk = ids[start:start + 900]
+            self.cursor.execute(f"DELETE FROM {table} WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+
+    def uses_fts(self, search_term):
+        """Indica se a pesquisa por `search_term` é atendida pelo índice FTS5 (e não por LIKE)."""
+        # O trigram precisa de pelo menos 3 caracteres; termos menores usam LIKE
+        return self.fts_enabled and len(search_term) >= 3
+
+    def _search_filter(self, search_term, before_id=None):
+        """Monta a cláusula WHERE (e seus parâmetros) da pesquisa de vendas."""
+        conditions, params = [], []
+        if search_term and self.uses_fts(search_term):
+            conditions.append("id IN (SELECT rowid FROM vendas_fts WHERE vendas_fts MATCH ?)")
+            params.append('"' + search_term.replace('"', '""') + '"') # Frase literal
+        elif search_term:
+            search_pattern = f"%{search_term}%"
+            conditions.append("(nome_cliente LIKE ? OR nome_produto LIKE ? OR nome_vendedor LIKE ?)")
+            params.extend([search_pattern, search_pattern, search_pattern])
+        if before_id is not None:
+            conditions.append("id < ?")
+            params.append(before_id)
+        if not conditions:
+            return "", params
+        return " WHERE " + " AND ".join(conditions), params
+
+    def fetch_all_sales(self, search_term="", limit=None, before_id=None):
+        """
+        Busca as vendas (mais recentes primeiro), opcionalmente filtrando por um termo de busca.
+        Com `limit`, retorna uma página; a seguinte é pedida com `before_id` = menor id já recebido
+        (paginação por chave: o SQLite desce direto ao ponto certo do índice, sem OFFSET).
+        """
         try:
-            query = "SELECT id, data_hora, nome_cliente, nome_produto, quantidade, preco, tipo_pagamento, preco_final, nome_vendedor FROM vendas"
-            params = []
-            if search_term:
-                search_pattern = f"%{search_term}%"
-                query += " WHERE nome_cliente LIKE ? OR nome_produto LIKE ? OR nome_vendedor LIKE ?"
-                params.extend([search_pattern, search_pattern, search_pattern])
-            query += " ORDER BY id DESC"
+            where, params = self._search_filter(search_term, before_id)
+            query = self.SQL_SELECT_SALES + where + " ORDER BY id DESC"
+            if limit is not None:
+                query += " LIMIT ?"
+                params.append(limit)
             self.cursor.execute(query, params)
             return self.cursor.fetchall()
         except sqlite3.Error as e:
             messagebox.showerror("Erro de Banco de Dados", f"Erro ao buscar vendas: {e}")
             return []
+
+    def fetch_sales_total(self, search_term=""):
+        """
+        Soma o preço final das vendas que casam com o termo de busca.
+        O resultado fica guardado até a próxima gravação em 'vendas': repetir uma
+        pesquisa (ou limpá-la) não percorre a tabela de novo.
+        """
+        if search_term in self._totais_cache:
+            return self._totais_cache[search_term]
+        try:
+            where, params = self._search_filter(search_term)
+            self.cursor.execute("SELECT COALESCE(SUM(preco_final), 0.0) FROM vendas" + where, params)
+            total = self.cursor.fetchone()[0]
+            if len(self._totais_cache) >= self.TOTAIS_CACHE_MAX:
+                # Descarta o termo mais antigo (dicionários preservam a ordem de inserção)
+                del self._totais_cache[next(iter(self._totais_cache))]
+            self._totais_cache[search_term] = total
+            return total
+        except sqlite3.Error as e:
+            messagebox.showerror("Erro de Banco de Dados", f"Erro ao somar vendas: {e}")
+            return 0.0
     
     def fetch_sales_as_dataframe(self):
         """Busca todas as vendas e retorna como um DataFrame do Pandas."""
@@ -202,7 +357,7 @@ class DatabaseManager:
     def fetch_sale_by_id(self, sale_id):
         """Busca uma venda específica pelo ID."""
         try:
-            self.cursor.execute("SELECT id, nome_cliente, nome_produto, quantidade, preco, tipo_pagamento, nome_vendedor FROM vendas WHERE id=?", (sale_id,))
+            self.cursor.execute(self.SQL_FETCH_SALE_BY_ID, (sale_id,))
             return self.cursor.fetchone()
         except sqlite3.Error as e:
             messagebox.showerror("Erro de Banco de Dados", f"Erro ao buscar venda por ID: {e}")
@@ -210,7 +365,7 @@ class DatabaseManager:
 
     # --- Métodos para Encomendas ---
     def insert_encomenda(self, data):
-        """Insere uma nova encomenda."""
+        """Insere uma nova encomenda e retorna o seu ID (None em caso de erro)."""
         try:
             self.cursor.execute("""
             INSERT INTO encomendas (data_hora_registro, nome_cliente, produto, quantidade, valor_unitario, data_entrega)
@@ -218,9 +373,11 @@ class DatabaseManager:
             """, (data["data_hora_registro"], data["nome_cliente"], data["produto"],
                   data["quantidade"], data["valor_unitario"], data["data_entrega"]))
             self.conn.commit()
+            return self.cursor.lastrowid
         except sqlite3.Error as e:
             self.conn.rollback()
             messagebox.showerror("Erro de Banco de Dados", f"Erro ao inserir encomenda: {e}")
+            return None
 
     def update_encomenda(self, encomenda_id, data):
         """Atualiza uma encomenda."""
@@ -231,18 +388,22 @@ class DatabaseManager:
             """, (data["nome_cliente"], data["produto"], data["quantidade"],
                   data["valor_unitario"], data["data_entrega"], encomenda_id))
             self.conn.commit()
+            return True
         except sqlite3.Error as e:
             self.conn.rollback()
             messagebox.showerror("Erro de Banco de Dados", f"Erro ao atualizar encomenda: {e}")
+            return False
 
-    def delete_encomenda(self, encomenda_id):
-        """Exclui uma encomenda."""
+    def delete_encomendas_bulk(self, encomenda_ids):
+        """Exclui várias encomendas numa única transação."""
         try:
-            self.cursor.execute("DELETE FROM encomendas WHERE id=?", (encomenda_id,))
+            self._delete_ids("encomendas", encomenda_ids)
             self.conn.commit()
+            return True
         except sqlite3.Error as e:
             self.conn.rollback()
-            messagebox.showerror("Erro de Banco de Dados", f"Erro ao excluir encomenda: {e}")
+            messagebox.showerror("Erro de Banco de Dados", f"Erro ao excluir encomendas: {e}")
+            return False
     
     def clear_all_encomendas(self):
         """Limpa todas as encomendas da tabela."""
@@ -274,20 +435,39 @@ class DatabaseManager:
             return ""
 
     def save_anotacoes(self, content):
-        """Salva o conteúdo das anotações."""
+        """Salva o conteúdo das anotações. Retorna True se a gravação foi concluída."""
         try:
             # UPDATE OR INSERT para garantir que o registro exista
             self.cursor.execute("UPDATE anotacoes SET conteudo=? WHERE id=1", (content,))
             self.conn.commit()
+            return True
         except sqlite3.Error as e:
             self.conn.rollback()
             messagebox.showerror("Erro de Banco de Dados", f"Erro ao salvar anotações: {e}")
+            return False
+
+    def open_read_only_connection(self):
+        """
+        Abre uma conexão extra, somente leitura, para consultas longas em outra thread
+        (ex.: exportação). Todas as gravações continuam na conexão única self.conn,
+        compartilhada por todas as janelas.
+        """
+        uri = Path(os.path.abspath(self.db_path)).as_uri() + "?mode=ro"
+        return sqlite3.connect(uri, uri=True)
 
     def close_connection(self):
         """Fecha a conexão com o banco de dados e reexibe o arquivo no Windows."""
         if self.conn:
+            try:
+                # Atualiza as estatísticas do planejador de consultas antes de sair
+                self.conn.execute("PRAGMA optimize")
+                # Devolve o conteúdo do -wal ao arquivo principal e o zera, para não deixar
+                # um arquivo auxiliar visível ao lado do banco oculto
+                self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except sqlite3.Error as e:
+                print(f"Não foi possível otimizar o banco de dados: {e}")
             self.conn.close()
-        if os.name == 'nt' and os.path.exists(self.db_path):
+        if _IS_WINDOWS:
             try:
                 # Atributo NORMAL
                 ctypes.windll.kernel32.SetFileAttributesW(self.db_path, 0x80)
@@ -301,8 +481,6 @@ class CadernoVirtual:
     Gerencia a janela e a lógica para as encomendas,
     agora utilizando o banco de dados.
     """
-    TOTAL_ROW_ID = "caderno_total_row"
-
     def __init__(self, parent_root, theme_style, db_manager):
         self.db_manager = db_manager
         self.caderno_window = tk.Toplevel(parent_root)
@@ -311,20 +489,13 @@ class CadernoVirtual:
         self.caderno_window.transient(parent_root)
         self.caderno_window.grab_set()
 
+        # Os estilos 'Caderno.*' são registrados uma única vez em SalesApp._register_styles
         self.style = theme_style
-        self._setup_styles()
+        self._valores = {} # iid -> valor total da encomenda, para manter o total sem reler a Treeview
 
         self._create_widgets()
         self._load_content()
         self._reset_input_fields()
-    
-    def _setup_styles(self):
-        self.style.configure('Caderno.TFrame', background=self.style.lookup('TFrame', 'background'))
-        self.style.configure('Caderno.TButton', font=('Arial', 10, 'bold'))
-        self.style.configure('Caderno.TLabel', font=('Arial', 12, 'bold'))
-        self.style.configure('Caderno.Treeview.Heading', font=('Arial', 10, 'bold'))
-        self.style.configure('Caderno.Treeview', rowheight=25)
-        self.style.map('Caderno.Treeview', background=[('selected', self.style.colors.primary)])
 
     def _create_widgets(self):
         frame_caderno = ttk.Frame(self.caderno_window, padding=10, style='Caderno.TFrame')
@@ -377,6 +548,10 @@ class CadernoVirtual:
         self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
         self.selected_item_iid = None
 
+        # Total geral fora da Treeview: a tabela só contém encomendas
+        self.total_label = ttk.Label(frame_caderno, text="TOTAL GERAL: 0,00", font=('Arial', 10, 'bold'), style='Caderno.TLabel', anchor='e')
+        self.total_label.pack(fill=tk.X, padx=5)
+
         # Botões de gestão
         frame_botoes_gestao = ttk.Frame(frame_caderno, style='Caderno.TFrame')
         frame_botoes_gestao.pack(fill=tk.X, pady=(10, 0))
@@ -387,21 +562,44 @@ class CadernoVirtual:
 
     def _load_content(self):
         """Carrega encomendas do banco de dados para a Treeview."""
+        # Tira a Treeview do layout durante a carga, como em SalesApp.atualizar_tabela:
+        # a geometria é recalculada uma única vez, ao reexibi-la.
+        self.tree.pack_forget()
+        try:
+            self._preencher_tabela()
+        finally:
+            self.tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5, before=self.total_label)
+
+    def _preencher_tabela(self):
+        """Substitui as linhas da Treeview pelas encomendas atuais do banco e refaz o total."""
         self.tree.delete(*self.tree.get_children())
         encomendas = self.db_manager.fetch_all_encomendas()
+
+        # Monta todas as linhas em Python primeiro; o total sai da mesma passada,
+        # sem precisar reler cada item da Treeview (uma chamada Tcl por linha).
+        linhas = []
+        self._valores = {}
         for enc in encomendas:
-            encomenda_id, data_reg, nome, prod, qtd, val_unit, data_ent = enc
             try:
-                valor_total = int(qtd) * float(val_unit)
-                self.tree.insert('', tk.END, iid=encomenda_id, values=(
-                    encomenda_id, data_reg, nome, prod, qtd,
-                    f"{val_unit:.2f}".replace(".", ","),
-                    data_ent,
-                    f"{valor_total:.2f}".replace(".", ",")
-                ))
+                valor_total, values = self._montar_linha(*enc)
             except (ValueError, TypeError):
                 continue
-        self._calculate_total()
+            self._valores[str(enc[0])] = valor_total
+            linhas.append((enc[0], values))
+
+        for encomenda_id, values in linhas:
+            self.tree.insert('', tk.END, iid=encomenda_id, values=values)
+        self._exibir_total()
+
+    def _montar_linha(self, encomenda_id, data_reg, nome, prod, qtd, val_unit, data_ent):
+        """Retorna o valor total da encomenda e os valores formatados da sua linha na Treeview."""
+        valor_total = int(qtd) * float(val_unit)
+        return valor_total, (
+            encomenda_id, data_reg, nome, prod, qtd,
+            _fmt_decimal(val_unit),
+            data_ent,
+            _fmt_decimal(valor_total)
+        )
     
     def _validate_inputs(self):
         """Valida e retorna os dados dos campos de entrada."""
@@ -423,7 +621,7 @@ class CadernoVirtual:
             return None
 
         try:
-            valor_unitario = float(valor_unitario_str.replace(",", "."))
+            valor_unitario = _parse_valor(valor_unitario_str)
             if valor_unitario < 0: raise ValueError
         except ValueError:
             messagebox.showwarning("Atenção", "Valor por unidade inválido.")
@@ -439,8 +637,16 @@ class CadernoVirtual:
         data = self._validate_inputs()
         if data:
             data["data_hora_registro"] = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-            self.db_manager.insert_encomenda(data)
-            self._load_content()
+            encomenda_id = self.db_manager.insert_encomenda(data)
+            if encomenda_id is None:
+                return
+            # Só a nova linha entra na tabela (no topo, como na ordem por ID decrescente)
+            valor_total, values = self._montar_linha(
+                encomenda_id, data["data_hora_registro"], data["nome_cliente"], data["produto"],
+                data["quantidade"], data["valor_unitario"], data["data_entrega"])
+            self.tree.insert('', 0, iid=encomenda_id, values=values)
+            self._valores[str(encomenda_id)] = valor_total
+            self._exibir_total()
             self._reset_input_fields()
     
     def _update_encomenda(self):
@@ -451,15 +657,23 @@ class CadernoVirtual:
 
         data = self._validate_inputs()
         if data:
-            self.db_manager.update_encomenda(self.selected_item_iid, data)
+            iid = self.selected_item_iid
+            if not self.db_manager.update_encomenda(iid, data):
+                return
+            data_reg = self.tree.set(iid, "Data e Hora") # Não muda na atualização
+            valor_total, values = self._montar_linha(
+                iid, data_reg, data["nome_cliente"], data["produto"],
+                data["quantidade"], data["valor_unitario"], data["data_entrega"])
+            self.tree.item(iid, values=values)
+            self._valores[iid] = valor_total
+            self._exibir_total()
             messagebox.showinfo("Sucesso", "Encomenda atualizada!")
-            self._load_content()
             self._reset_input_fields()
 
     def _on_tree_select(self, event):
         """Carrega os dados da encomenda selecionada nos campos de entrada."""
         selected_items = self.tree.selection()
-        if not selected_items or selected_items[0] == self.TOTAL_ROW_ID:
+        if not selected_items:
             self._reset_input_fields()
             return
 
@@ -478,17 +692,20 @@ class CadernoVirtual:
 
     def _delete_encomenda(self):
         """Exclui a(s) encomenda(s) selecionada(s)."""
-        selected_items = [item for item in self.tree.selection() if item != self.TOTAL_ROW_ID]
+        selected_items = self.tree.selection()
         if not selected_items:
             messagebox.showwarning("Atenção", "Selecione uma ou mais encomendas para excluir.")
             return
 
         msg = f"Tem certeza que deseja excluir {len(selected_items)} encomenda(s)?"
         if messagebox.askyesno("Confirmar Exclusão", msg):
-            for item_id in selected_items:
-                self.db_manager.delete_encomenda(item_id)
+            if not self.db_manager.delete_encomendas_bulk(selected_items):
+                return
+            self.tree.delete(*selected_items)
+            for iid in selected_items:
+                self._valores.pop(iid, None)
+            self._exibir_total()
             messagebox.showinfo("Sucesso", f"{len(selected_items)} encomenda(s) excluída(s).")
-            self._load_content()
             self._reset_input_fields()
 
     def _reset_input_fields(self):
@@ -511,21 +728,11 @@ class CadernoVirtual:
             self._load_content()
             self._reset_input_fields()
 
-    def _calculate_total(self):
-        """Calcula e exibe o total na Treeview."""
-        if self.tree.exists(self.TOTAL_ROW_ID):
-            self.tree.delete(self.TOTAL_ROW_ID)
-
-        total_valor = sum(float(self.tree.item(item, 'values')[7].replace(",", "."))
-                              for item in self.tree.get_children()
-                              if item != self.TOTAL_ROW_ID)
-
-        total_formatado = f"{total_valor:.2f}".replace(".", ",")
-        self.tree.insert('', tk.END, iid=self.TOTAL_ROW_ID, values=(
-            "", "", "", "", "", "", "TOTAL GERAL:", total_formatado
-        ), tags=('total_row',))
-        
-        self.tree.tag_configure('total_row', background=self.style.lookup('TFrame', 'background'), font=('Arial', 10, 'bold'))
+    def _exibir_total(self):
+        """Mostra no rótulo abaixo da tabela o total das encomendas, somado a partir de `_valores`."""
+        # fsum soma sem acumular resíduo de arredondamento (que apareceria como "-0,00")
+        total = math.fsum(self._valores.values())
+        self.total_label.configure(text=f"TOTAL GERAL: {_fmt_decimal(total)}")
 
 
 # --- Classe para as Anotações Virtuais ---
@@ -541,6 +748,7 @@ class AnotacoesVirtual:
         self.anotacoes_window.protocol("WM_DELETE_WINDOW", self._on_closing)
 
         self.style = theme_style
+        self._status_after_id = None # Limpeza agendada da barra de status
         self._create_widgets()
         self._load_content()
     
@@ -559,17 +767,40 @@ class AnotacoesVirtual:
         ttk.Button(frame_botoes, text="Limpar", command=self._clear_content, style='danger.TButton').pack(side=tk.LEFT, expand=True, padx=5)
         ttk.Button(frame_botoes, text="Fechar", command=self._on_closing, style='secondary.TButton').pack(side=tk.RIGHT, expand=True, padx=5)
 
+        # Barra de status: confirma o salvamento sem abrir um diálogo modal
+        self.status_label = ttk.Label(frame_anotacoes, text="")
+        self.status_label.pack(fill=tk.X, pady=(5, 0))
+
     def _load_content(self):
         """Carrega anotações do banco de dados."""
         content = self.db_manager.fetch_anotacoes()
         self.text_area.delete(1.0, tk.END)
         self.text_area.insert(1.0, content)
+        self.text_area.edit_modified(False) # O texto carregado é o que já está no banco
 
-    def _save_content(self):
-        """Salva o conteúdo no banco de dados."""
-        content = self.text_area.get(1.0, tk.END).strip()
-        self.db_manager.save_anotacoes(content)
-        messagebox.showinfo("Salvo", "Anotações salvas com sucesso!", parent=self.anotacoes_window)
+    def _save_content(self, mostrar_status=True):
+        """
+        Salva o conteúdo no banco de dados, se ele mudou desde a última gravação.
+        Com mostrar_status=False (ao fechar) não agenda a limpeza da barra de status.
+        """
+        # O próprio Tk liga o flag 'modified' do Text a cada edição: sem alterações,
+        # não há UPDATE nem commit (ex.: ao fechar logo após salvar).
+        if self.text_area.edit_modified():
+            content = self.text_area.get(1.0, tk.END).strip()
+            if not self.db_manager.save_anotacoes(content):
+                return
+            self.text_area.edit_modified(False)
+        if not mostrar_status:
+            return
+        self.status_label.config(text="Anotações salvas com sucesso!")
+        if self._status_after_id:
+            self.anotacoes_window.after_cancel(self._status_after_id)
+        self._status_after_id = self.anotacoes_window.after(4000, self._clear_status)
+
+    def _clear_status(self):
+        """Limpa a barra de status."""
+        self._status_after_id = None
+        self.status_label.config(text="")
 
     def _clear_content(self):
         """Limpa o campo de texto e salva."""
@@ -579,7 +810,12 @@ class AnotacoesVirtual:
 
     def _on_closing(self):
         """Salva ao fechar e destrói a janela."""
-        self._save_content()
+        self._save_content(mostrar_status=False)
+        # O destroy apaga o comando Tcl do callback agendado: cancela-o antes,
+        # senão o Tk acusaria "invalid command name" quando o after disparasse.
+        if self._status_after_id:
+            self.anotacoes_window.after_cancel(self._status_after_id)
+            self._status_after_id = None
         self.anotacoes_window.destroy()
 
 
@@ -706,11 +942,11 @@ class CalculadoraPrecoVenda(ttk.Frame):
         return False
 
     def format_currency(self, value):
-        return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        return f"R$ {value:,.2f}".translate(_PT_BR_SEPARADORES)
 
     def parse_float(self, value_str):
         if not value_str: return 0.0
-        return float(value_str.replace(",", "."))
+        return _parse_valor(value_str)
 
     def copy_to_clipboard(self, text):
         self.clipboard_clear()
@@ -786,7 +1022,7 @@ class CalculadoraPrecoVenda(ttk.Frame):
             row = ttk.Frame(self.details_frame)
             row.pack(fill=X, padx=5, pady=2)
             ttk.Label(row, text=label).pack(side=LEFT, expand=True, anchor='w')
-            ttk.Label(row, text=f"{value:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."), width=15).pack(side=LEFT, anchor='e')
+            ttk.Label(row, text=f"{value:,.2f}".translate(_PT_BR_SEPARADORES), width=15).pack(side=LEFT, anchor='e')
             ttk.Label(row, text=f"{percentage:.2f}%", width=10).pack(side=LEFT, anchor='e')
 
         self.details_frame.pack(fill=X, pady=10)
@@ -833,13 +1069,13 @@ class CalculadoraPrecoVenda(ttk.Frame):
         dados = [
             datetime.now().strftime("%d-%m-%Y %H:%M:%S"),
             self.inputs['nome_produto'],
-            f"{self.inputs['custo_produto']:.2f}".replace(".", ","),
-            f"{self.inputs['gasto_operacional']:.2f}".replace(".", ","),
-            f"{self.inputs['impostos_pct']:.2f}".replace(".", ","),
-            f"{self.inputs['custo_transacao_pct']:.2f}".replace(".", ","),
-            f"{self.inputs['margem_lucro_pct']:.2f}".replace(".", ","),
-            f"{self.results['preco_venda_ideal']:.2f}".replace(".", ","),
-            f"{self.results['lucro_estimado']:.2f}".replace(".", ",")
+            _fmt_decimal(self.inputs['custo_produto']),
+            _fmt_decimal(self.inputs['gasto_operacional']),
+            _fmt_decimal(self.inputs['impostos_pct']),
+            _fmt_decimal(self.inputs['custo_transacao_pct']),
+            _fmt_decimal(self.inputs['margem_lucro_pct']),
+            _fmt_decimal(self.results['preco_venda_ideal']),
+            _fmt_decimal(self.results['lucro_estimado'])
         ]
 
         unidades = self.inputs.get('unidades', 0)
@@ -849,11 +1085,12 @@ class CalculadoraPrecoVenda(ttk.Frame):
             lucro_unitario = self.results['lucro_estimado'] / unidades
             dados.extend([
                 f"{unidades:.0f}",
-                f"{preco_unitario:.2f}".replace(".", ","),
-                f"{lucro_unitario:.2f}".replace(".", ",")
+                _fmt_decimal(preco_unitario),
+                _fmt_decimal(lucro_unitario)
             ])
 
         try:
+            import openpyxl
             is_new_file = not os.path.exists(filepath)
             workbook = openpyxl.load_workbook(filepath) if not is_new_file else openpyxl.Workbook()
             sheet = workbook.active
@@ -879,12 +1116,44 @@ class CalculadoraPrecoVenda(ttk.Frame):
 # --- Classe Principal da Aplicação ---
 class SalesApp:
     """Classe principal da aplicação de gestão de vendas."""
-    TOTAL_ROW_ID = "total_row_id"
+    # Abas da exportação: (nome da aba, tabela, ((cabeçalho, expressão SQL), ...), cabeçalhos monetários)
+    EXPORT_SHEETS = (
+        ("Vendas", "vendas", (
+            ("ID Venda", "id"), ("data_hora", "data_hora"), ("nome_cliente", "nome_cliente"),
+            ("nome_produto", "nome_produto"), ("quantidade", "quantidade"), ("Valor Unid. (R$)", "preco"),
+            ("tipo_pagamento", "tipo_pagamento"), ("Preço Final (R$)", "preco_final"), ("nome_vendedor", "nome_vendedor"),
+        ), {"Valor Unid. (R$)", "Preço Final (R$)"}),
+        ("Encomendas", "encomendas", (
+            ("ID Encomenda", "id"), ("data_hora_registro", "data_hora_registro"), ("nome_cliente", "nome_cliente"),
+            ("produto", "produto"), ("quantidade", "quantidade"), ("Valor Unid. (R$)", "valor_unitario"),
+            ("data_entrega", "data_entrega"), ("Valor Total (R$)", "quantidade * valor_unitario"),
+        ), {"Valor Unid. (R$)", "Valor Total (R$)"}),
+    )
+    PAGE_SIZE = 200 # Linhas inseridas na Treeview por vez (o restante fica em memória)
+
+    # --- Metadados do formulário e da tabela de vendas (fixos, definidos uma única vez) ---
+    FORM_LABELS = ("Nome do Cliente:", "Nome do Produto:", "Quantidade:", "Valor por unidade (R$):", "Tipo de Pagamento:", "Nome do Vendedor:")
+    FORM_TOOLTIPS = {
+        "Nome do Cliente:": "Nome do cliente ou 'Consumidor Final'.",
+        "Nome do Produto:": "O item vendido (ex: Pão Francês, Bolo de Chocolate).",
+        "Quantidade:": "Número de itens vendidos (somente números inteiros positivos).",
+        "Valor por unidade (R$):": "Preço unitário. Use vírgula para centavos (ex: 5,50).",
+        "Tipo de Pagamento:": "Selecione a forma de pagamento.",
+        "Nome do Vendedor:": "Seu nome ou nome do funcionário.",
+    }
+    PAYMENT_TYPES = ("Dinheiro", "Cartão de Crédito", "Cartão de Débito", "Pix")
+    # (coluna, título, largura) na ordem de exibição
+    VENDAS_COLUMNS = (
+        ("data_hora", "Data e Hora", 140), ("nome_cliente", "Cliente", 150), ("nome_produto", "Produto", 150),
+        ("quantidade", "Qtd.", 60), ("preco", "Valor Unid. (R$)", 120), ("tipo_pagamento", "Pagamento", 120),
+        ("preco_final", "Preço Final (R$)", 120), ("nome_vendedor", "Vendedor", 150),
+    )
 
     def __init__(self, root):
         self.root = root
         self._setup_paths_and_dirs()
         self._setup_style()
+        self._register_styles()
         
         self.root.title("Sistema de Gestão de Vendas e Precificação")
         self.root.geometry("1150x850")
@@ -893,6 +1162,23 @@ class SalesApp:
         self.id_venda_em_edicao = None
         
         self.graph_canvas = {} # Dicionário para guardar os canvases dos gráficos
+        self._search_after_id = None # Pesquisa agendada (debounce do campo de busca)
+        self._last_search = None # Último termo efetivamente pesquisado
+        self._base_search = None # Termo da última consulta SQL (base para o filtro local)
+        self._all_iids = [] # Vendas carregadas na tabela, na ordem de exibição
+        self._row_search_blobs = {} # iid -> texto pesquisável (cliente, produto, vendedor), já em minúsculas
+        self._precos_finais = {} # iid -> preço final, para o total do filtro local
+        self._linhas_vendas = {} # iid -> valores formatados da linha, para inserção sob demanda
+        self._row_cache = {} # iid -> campos editáveis da venda (mesmo formato de fetch_sale_by_id)
+        self._iids_filtrados = [] # Vendas que casam com o filtro atual, na ordem de exibição
+        self._exibidos = 0 # Quantas de _iids_filtrados já estão visíveis na Treeview
+        self._materializados = set() # iids que já existem como itens da Treeview
+        self._carga_pendente = False # Evita agendar mais de uma página por vez
+        self._menor_id_carregado = None # Chave da próxima página a buscar no banco
+        self._tudo_carregado = True # Se todas as vendas da consulta atual já estão em memória
+        # Comandos externos detectados uma única vez, na inicialização
+        self._open_cmd = self._detect_open_cmd()
+        self._calc_cmd = self._detect_calc_cmd()
 
         self._create_widgets()
         self.atualizar_tabela()
@@ -922,6 +1208,20 @@ class SalesApp:
         self.current_theme_name = self._load_theme_setting()
         self.style = Style(theme=self.current_theme_name)
         self.style.configure("TButton", padding=(10, 5))
+        # A lista de temas não muda durante a execução: consulta o Tcl uma única vez
+        self.available_themes = tuple(sorted(self.style.theme_names()))
+
+    def _register_styles(self):
+        """
+        Registra os estilos ttk das janelas auxiliares (Caderno) uma única vez.
+        Deve ser chamado novamente apenas quando o tema muda, pois as cores dependem dele.
+        """
+        self.style.configure('Caderno.TFrame', background=self.style.lookup('TFrame', 'background'))
+        self.style.configure('Caderno.TButton', font=('Arial', 10, 'bold'))
+        self.style.configure('Caderno.TLabel', font=('Arial', 12, 'bold'))
+        self.style.configure('Caderno.Treeview.Heading', font=('Arial', 10, 'bold'))
+        self.style.configure('Caderno.Treeview', rowheight=25)
+        self.style.map('Caderno.Treeview', background=[('selected', self.style.colors.primary)])
 
     def _create_widgets(self):
         """Cria e organiza todos os widgets da interface gráfica."""
@@ -934,12 +1234,20 @@ class SalesApp:
         frame_theme = ttk.Frame(top_frame)
         frame_theme.pack(side=RIGHT)
         ttk.Label(frame_theme, text="Tema:").pack(side=tk.LEFT, padx=5)
-        self.available_themes = sorted(list(self.style.theme_names()))
         self.theme_combobox = ttk.Combobox(frame_theme, values=self.available_themes, state="readonly", width=15)
         self.theme_combobox.set(self.current_theme_name)
         self.theme_combobox.pack(side=tk.LEFT)
         self.theme_combobox.bind("<<ComboboxSelected>>", self.change_theme)
 
+        # --- Barra de Status (mensagens rápidas, sem diálogo modal) ---
+        status_frame = ttk.Frame(self.root, padding=(10, 0, 10, 5))
+        status_frame.pack(side=BOTTOM, fill=X)
+        self.status_label = ttk.Label(status_frame, text="")
+        self.status_label.pack(side=LEFT, fill=X, expand=True)
+        # Indicador de atividade, exibido apenas durante a exportação
+        self.status_progress = ttk.Progressbar(status_frame, mode='indeterminate', length=150)
+        self._status_after_id = None
+
         # --- Notebook (Sistema de Abas) ---
         notebook = ttk.Notebook(self.root, padding=10)
         notebook.pack(fill=BOTH, expand=True)
@@ -970,29 +1278,25 @@ class SalesApp:
         frame_formulario.grid(row=0, column=0, padx=10, pady=10, sticky="ew")
         frame_formulario.grid_columnconfigure(1, weight=1)
         
-        # Dicionário para Tooltips (APRIMORAMENTO)
-        tooltips = {
-            "Nome do Cliente:": "Nome do cliente ou 'Consumidor Final'.",
-            "Nome do Produto:": "O item vendido (ex: Pão Francês, Bolo de Chocolate).",
-            "Quantidade:": "Número de itens vendidos (somente números inteiros positivos).",
-            "Valor por unidade (R$):": "Preço unitário. Use vírgula para centavos (ex: 5,50).",
-            "Tipo de Pagamento:": "Selecione a forma de pagamento.",
-            "Nome do Vendedor:": "Seu nome ou nome do funcionário.",
-        }
-
-        labels_info = ["Nome do Cliente:", "Nome do Produto:", "Quantidade:", "Valor por unidade (R$):", "Tipo de Pagamento:", "Nome do Vendedor:"]
+        labels_info = self.FORM_LABELS
         self.campos = {}
+        # Chaves separadas por tipo de widget, para limpar o formulário sem isinstance
+        self._combobox_keys = []
+        self._entry_keys = []
         for i, text in enumerate(labels_info):
             ttk.Label(frame_formulario, text=text).grid(row=i, column=0, sticky="w", padx=5, pady=5)
+            chave = text.split(':')[0]
             if text == "Tipo de Pagamento:":
-                widget = ttk.Combobox(frame_formulario, values=["Dinheiro", "Cartão de Crédito", "Cartão de Débito", "Pix"], state="readonly")
+                widget = ttk.Combobox(frame_formulario, values=self.PAYMENT_TYPES, state="readonly")
+                self._combobox_keys.append(chave)
             else:
                 widget = ttk.Entry(frame_formulario)
+                self._entry_keys.append(chave)
             widget.grid(row=i, column=1, sticky="ew", padx=5, pady=5)
-            self.campos[text.split(':')[0]] = widget
+            self.campos[chave] = widget
             
             # Aplica o ToolTip (APRIMORAMENTO)
-            ToolTip(widget, text=tooltips.get(text, "Campo de preenchimento."))
+            ToolTip(widget, text=self.FORM_TOOLTIPS.get(text, "Campo de preenchimento."))
 
 
         frame_botoes_form = ttk.Frame(frame_formulario)
@@ -1011,12 +1315,15 @@ class SalesApp:
             "Exportar Vendas/Encomendas": (self.exportar_dados, "primary.TButton"),
             "Importar Planilha": (self.iniciar_importacao, "success.TButton"),
             "Abrir Planilha": (self.abrir_planilha_excel, "info.TButton"),
-            "Calculadora": (lambda: subprocess.Popen('calc.exe') if os.name == 'nt' else subprocess.Popen('gnome-calculator'), "secondary.TButton"),
+            "Calculadora": (self.abrir_calculadora, "secondary.TButton"),
             "Encomendas": (self.abrir_caderno_encomendas, "success.TButton"),
             "Anotações": (self.abrir_anotacoes, "success.TButton"),
         }
+        self.btns_gestao = {}
         for i, (text, (command, style)) in enumerate(botoes_gestao.items()):
-            ttk.Button(frame_gestao, text=text, command=command, style=style).pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
+            botao = ttk.Button(frame_gestao, text=text, command=command, style=style)
+            botao.pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
+            self.btns_gestao[text] = botao
             frame_gestao.grid_columnconfigure(i, weight=1)
 
         # --- Tabela de Vendas ---
@@ -1030,24 +1337,25 @@ class SalesApp:
         ttk.Label(frame_pesquisa, text="Pesquisar:").pack(side=tk.LEFT, padx=(0, 5))
         self.search_entry = ttk.Entry(frame_pesquisa)
         self.search_entry.pack(side=tk.LEFT, expand=True, fill=tk.X)
-        self.search_entry.bind("<KeyRelease>", lambda e: self.atualizar_tabela())
-        ttk.Button(frame_pesquisa, text="Limpar", command=lambda: [self.search_entry.delete(0, tk.END), self.atualizar_tabela()]).pack(side=tk.LEFT, padx=5)
+        self.search_entry.bind("<KeyRelease>", self.on_search_key_release)
+        ttk.Button(frame_pesquisa, text="Limpar", command=self.limpar_pesquisa).pack(side=tk.LEFT, padx=5)
 
-        colunas = ("data_hora", "nome_cliente", "nome_produto", "quantidade", "preco", "tipo_pagamento", "preco_final", "nome_vendedor")
+        colunas = tuple(col for col, _, _ in self.VENDAS_COLUMNS)
         self.tree = ttk.Treeview(frame_tabela, columns=colunas, show="headings", selectmode="extended")
         self.tree.grid(row=1, column=0, sticky="nsew")
 
-        scrollbar_y = ttk.Scrollbar(frame_tabela, orient="vertical", command=self.tree.yview)
-        scrollbar_y.grid(row=1, column=1, sticky="ns")
-        self.tree.configure(yscrollcommand=scrollbar_y.set)
+        self.scrollbar_vendas = ttk.Scrollbar(frame_tabela, orient="vertical", command=self.tree.yview)
+        self.scrollbar_vendas.grid(row=1, column=1, sticky="ns")
+        # O callback de rolagem também materializa mais linhas perto do fim da lista
+        self.tree.configure(yscrollcommand=self._on_tree_yscroll)
 
-        headings = {"data_hora": "Data e Hora", "nome_cliente": "Cliente", "nome_produto": "Produto", "quantidade": "Qtd.",
-                    "preco": "Valor Unid. (R$)", "tipo_pagamento": "Pagamento", "preco_final": "Preço Final (R$)", "nome_vendedor": "Vendedor"}
-        widths = {"data_hora": 140, "quantidade": 60, "preco": 120, "tipo_pagamento": 120, "preco_final": 120}
-        
-        for col, text in headings.items():
+        for col, text, width in self.VENDAS_COLUMNS:
             self.tree.heading(col, text=text)
-            self.tree.column(col, width=widths.get(col, 150), anchor="center")
+            self.tree.column(col, width=width, anchor="center")
+
+        # Total geral num rótulo abaixo da tabela: a Treeview só contém vendas
+        self.total_label = ttk.Label(frame_tabela, text="TOTAL: 0,00", font=('Arial', 10, 'bold'), anchor="e")
+        self.total_label.grid(row=2, column=0, columnspan=2, sticky="ew", pady=(5, 0))
 
     def _create_dashboard_tab(self, parent_tab):
         """Cria os widgets da aba de Dashboard de Análise."""
@@ -1132,9 +1440,9 @@ class SalesApp:
         ticket_medio = faturamento_total / total_vendas if total_vendas > 0 else 0
         produto_mais_vendido = df_vendas.groupby('nome_produto')['quantidade'].sum().idxmax() if not df_vendas.empty else "-"
 
-        self.metric_labels["Faturamento Total"].config(text=f"R$ {faturamento_total:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
+        self.metric_labels["Faturamento Total"].config(text=f"R$ {faturamento_total:,.2f}".translate(_PT_BR_SEPARADORES))
         self.metric_labels["Total de Vendas"].config(text=f"{total_vendas}")
-        self.metric_labels["Ticket Médio"].config(text=f"R$ {ticket_medio:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
+        self.metric_labels["Ticket Médio"].config(text=f"R$ {ticket_medio:,.2f}".translate(_PT_BR_SEPARADORES))
         self.metric_labels["Produto Mais Vendido"].config(text=produto_mais_vendido)
 
         # Atualizar gráficos
@@ -1216,6 +1524,23 @@ class SalesApp:
         canvas_widget.draw()
 
 
+    def mostrar_status(self, texto, duracao_ms=4000):
+        """Exibe uma mensagem na barra de status e a apaga após `duracao_ms` (None mantém a mensagem)."""
+        if self._status_after_id:
+            self.root.after_cancel(self._status_after_id)
+            self._status_after_id = None
+        self.status_label.config(text=texto)
+        if duracao_ms is not None:
+            self._status_after_id = self.root.after(duracao_ms, self._limpar_status)
+
+    def _limpar_status(self):
+        self._status_after_id = None
+        self.status_label.config(text="")
+
+    def _show_error(self, title, msg, exc):
+        """Mostra um erro com a mensagem principal e o texto da exceção como detalhe."""
+        messagebox.showerror(title, msg, detail=str(exc))
+
     def abrir_caderno_encomendas(self):
         CadernoVirtual(self.root, self.style, self.db_manager)
 
@@ -1230,11 +1555,36 @@ class SalesApp:
             return
         
         try:
-            if os.name == 'nt': subprocess.Popen(['start', '', file_path], shell=True)
-            elif os.uname().sysname == 'Darwin': subprocess.Popen(['open', file_path])
-            else: subprocess.Popen(['xdg-open', file_path])
+            if self._open_cmd is None: os.startfile(file_path)
+            else: subprocess.Popen([*self._open_cmd, file_path])
+        except Exception as e:
+            self._show_error("Erro", "Não foi possível abrir a planilha.", e)
+
+    def abrir_calculadora(self):
+        if self._calc_cmd is None:
+            messagebox.showwarning("Atenção", "Nenhuma calculadora foi encontrada neste sistema.")
+            return
+        try:
+            subprocess.Popen(self._calc_cmd)
         except Exception as e:
-            messagebox.showerror("Erro", f"Não foi possível abrir a planilha: {e}")
+            self._show_error("Erro", "Não foi possível abrir a calculadora.", e)
+
+    @staticmethod
+    def _detect_open_cmd():
+        """Comando para abrir um arquivo no aplicativo padrão (None no Windows, que usa os.startfile)."""
+        if _IS_WINDOWS: return None
+        if sys.platform == 'darwin': return ['open']
+        return ['xdg-open']
+
+    @staticmethod
+    def _detect_calc_cmd():
+        """Procura a calculadora do sistema uma única vez; retorna a lista para o Popen ou None."""
+        if _IS_WINDOWS: return ['calc.exe']
+        if sys.platform == 'darwin': return ['open', '-a', 'Calculator']
+        for programa in ('gnome-calculator', 'kcalc', 'galculator', 'xcalc'):
+            caminho = shutil.which(programa)
+            if caminho: return [caminho]
+        return None
 
     def salvar_dados(self):
         try:
@@ -1252,7 +1602,7 @@ class SalesApp:
                 return
 
             quantidade = int(dados["quantidade"])
-            preco_unitario = float(dados["preco"].replace(",", "."))
+            preco_unitario = _parse_valor(dados["preco"])
             if quantidade <= 0 or preco_unitario < 0:
                 raise ValueError("Valores devem ser positivos.")
 
@@ -1263,39 +1613,43 @@ class SalesApp:
                 "data_hora": datetime.now().strftime("%d/%m/%Y %H:%M:%S")
             })
 
-            if self.id_venda_em_edicao is not None:
-                self.db_manager.update_sale(self.id_venda_em_edicao, dados)
-                messagebox.showinfo("Sucesso", "Venda atualizada!")
-            else:
-                self.db_manager.insert_sale(dados)
-                messagebox.showinfo("Sucesso", "Venda registrada!")
+            edicao = self.id_venda_em_edicao is not None
+            venda_id = self.db_manager.upsert_sale(dados, self.id_venda_em_edicao)
+            if venda_id is None:
+                return
+            messagebox.showinfo("Sucesso", "Venda atualizada!" if edicao else "Venda registrada!")
 
             self.limpar_campos_e_resetar_edicao()
-            self.atualizar_tabela()
+            # Com pesquisa ativa, a venda pode ter deixado de casar (ou passado a casar);
+            # uma venda editada que não está mais em memória também exige recarga.
+            if self._last_search or (edicao and str(venda_id) not in self._precos_finais):
+                self.atualizar_tabela()
+            else:
+                self._aplicar_venda_salva(venda_id, dados)
 
         except ValueError:
             messagebox.showerror("Erro de Validação", "Quantidade ou Preço inválidos. Verifique os valores inseridos.")
         except Exception as e:
-            messagebox.showerror("Erro Inesperado", f"Ocorreu um erro: {e}")
+            self._show_error("Erro Inesperado", "Ocorreu um erro ao salvar a venda.", e)
 
     def limpar_campos_e_resetar_edicao(self):
         self.id_venda_em_edicao = None
-        for widget in self.campos.values():
-            if isinstance(widget, ttk.Combobox):
-                widget.set("")
-            else:
-                widget.delete(0, tk.END)
+        for chave in self._combobox_keys:
+            self.campos[chave].set("")
+        for chave in self._entry_keys:
+            self.campos[chave].delete(0, tk.END)
         self.btn_salvar.config(text="Registrar Venda", style="success.TButton")
         self.btn_cancelar_edicao.pack_forget()
 
     def carregar_para_edicao(self):
         selecionado = self.tree.selection()
-        if not selecionado or len(selecionado) > 1 or selecionado[0] == self.TOTAL_ROW_ID:
+        if not selecionado or len(selecionado) > 1:
             messagebox.showwarning("Atenção", "Selecione uma única venda para editar.")
             return
 
         venda_id = int(selecionado[0])
-        venda = self.db_manager.fetch_sale_by_id(venda_id)
+        # A linha já veio do banco ao montar a tabela; só consulta de novo se não estiver em cache
+        venda = self._row_cache.get(selecionado[0]) or self.db_manager.fetch_sale_by_id(venda_id)
         if venda:
             self.limpar_campos_e_resetar_edicao()
             _, nome_cli, nome_prod, qtd, preco, tipo_pag, nome_vend = venda
@@ -1303,7 +1657,7 @@ class SalesApp:
             self.campos["Nome do Cliente"].insert(0, nome_cli)
             self.campos["Nome do Produto"].insert(0, nome_prod)
             self.campos["Quantidade"].insert(0, str(qtd))
-            self.campos["Valor por unidade (R$)"].insert(0, str(preco).replace(".", ","))
+            self.campos["Valor por unidade (R$)"].insert(0, str(preco).translate(_DOT_TO_COMMA))
             self.campos["Tipo de Pagamento"].set(tipo_pag)
             self.campos["Nome do Vendedor"].insert(0, nome_vend)
 
@@ -1312,19 +1666,36 @@ class SalesApp:
             self.btn_cancelar_edicao.pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
 
     def excluir_venda_selecionada(self):
-        selecionados = [item for item in self.tree.selection() if item != self.TOTAL_ROW_ID]
+        selecionados = self.tree.selection()
         if not selecionados:
             messagebox.showwarning("Atenção", "Selecione uma ou mais vendas para excluir.")
             return
 
         msg = f"Tem certeza que deseja excluir {len(selecionados)} venda(s)?"
         if messagebox.askyesno("Confirmar Exclusão", msg):
-            for item_id in selecionados:
-                self.db_manager.delete_sale(int(item_id))
+            if not self.db_manager.delete_sales_bulk([int(item_id) for item_id in selecionados]):
+                return
             messagebox.showinfo("Sucesso", f"{len(selecionados)} venda(s) excluída(s).")
-            self.atualizar_tabela()
+            self._remover_linhas(selecionados)
             self.limpar_campos_e_resetar_edicao()
 
+    def _remover_linhas(self, iids):
+        """Retira da tabela e do cache as vendas já excluídas do banco, sem recarregar a tabela."""
+        removidos = set(iids)
+        self.tree.delete(*iids)
+        self._exibidos -= sum(1 for iid in self._iids_filtrados[:self._exibidos] if iid in removidos)
+        self._iids_filtrados = [iid for iid in self._iids_filtrados if iid not in removidos]
+        self._all_iids = [iid for iid in self._all_iids if iid not in removidos]
+        self._materializados -= removidos
+        for iid in removidos:
+            self._precos_finais.pop(iid, None)
+            self._linhas_vendas.pop(iid, None)
+            self._row_search_blobs.pop(iid, None)
+            self._row_cache.pop(iid, None)
+        # Relê o total no banco (um único SUM) em vez de subtrair os preços do total
+        # exibido: subtrações sucessivas de float acumulam resíduo (ex.: "-0,00").
+        self._atualizar_total(self.db_manager.fetch_sales_total(self._last_search))
+
     # --- FUNÇÃO CORRIGIDA E MELHORADA PARA ESCOLHA DO LOCAL ---
     def exportar_dados(self):
         """Exporta todos os dados de Vendas e Encomendas para um único arquivo Excel, permitindo ao usuário escolher o local."""
@@ -1344,65 +1715,107 @@ class SalesApp:
         
         if not excel_path:
             return # Usuário cancelou
-        
+
+        # 3. A leitura do banco e a escrita da planilha rodam numa thread separada,
+        # mantendo a janela responsiva durante exportações grandes.
+        self.btns_gestao["Exportar Vendas/Encomendas"].config(state=tk.DISABLED)
+        self.status_progress.pack(side=RIGHT)
+        self.status_progress.start(10)
+        self.mostrar_status("Exportando dados...", duracao_ms=None)
+        threading.Thread(target=self._worker_export, args=(excel_path,), daemon=True).start()
+
+    def _finalizar_exportacao(self):
+        """Restaura a interface ao fim da exportação (chamado na thread do Tk)."""
+        self.status_progress.stop()
+        self.status_progress.pack_forget()
+        if self.status_label.cget("text") == "Exportando dados...":
+            self._limpar_status()
+        self.btns_gestao["Exportar Vendas/Encomendas"].config(state=tk.NORMAL)
+
+    def _worker_export(self, excel_path):
+        """(Worker Thread) Lê Vendas e Encomendas do banco e grava a planilha Excel."""
+        tmp_path = None
+        # Conexão própria da thread: as consultas longas da exportação não disputam
+        # o cursor compartilhado usado pela interface.
+        conn = None
         try:
-            # 3. Obter DataFrames
-            df_vendas = pd.read_sql_query("SELECT id, data_hora, nome_cliente, nome_produto, quantidade, preco, tipo_pagamento, preco_final, nome_vendedor FROM vendas", self.db_manager.conn)
-            df_enc = pd.read_sql_query("SELECT id, data_hora_registro, nome_cliente, produto, quantidade, valor_unitario, data_entrega FROM encomendas", self.db_manager.conn)
-            
-            if df_vendas.empty and df_enc.empty:
-                 messagebox.showwarning("Aviso", "Não há dados de Vendas nem Encomendas para exportar.")
+            # Aberta dentro do try: se falhar, o erro é mostrado e o finally ainda
+            # reabilita o botão de exportação.
+            conn = self.db_manager.open_read_only_connection()
+            # 1. Conta as linhas e mede o maior texto de cada coluna (para a largura)
+            # numa única consulta agregada por tabela, sem carregar os dados.
+            stats = {}
+            for sheet_name, table, columns, _ in self.EXPORT_SHEETS:
+                lengths = ", ".join(f"MAX(LENGTH({expr}))" for _, expr in columns)
+                row = conn.execute(f"SELECT COUNT(*), {lengths} FROM {table}").fetchone()
+                stats[sheet_name] = (row[0], row[1:])
+
+            if not any(count for count, _ in stats.values()):
+                 self.root.after(0, lambda: messagebox.showwarning("Aviso", "Não há dados de Vendas nem Encomendas para exportar."))
                  return
                  
-            # 4. Preparar DataFrames para exportação
-            if not df_vendas.empty:
-                df_vendas.rename(columns={'id': 'ID Venda', 'preco': 'Valor Unid. (R$)', 'preco_final': 'Preço Final (R$)'}, inplace=True)
-            
-            if not df_enc.empty:
-                df_enc['Valor Total (R$)'] = df_enc['quantidade'] * df_enc['valor_unitario']
-                df_enc.rename(columns={'id': 'ID Encomenda', 'valor_unitario': 'Valor Unid. (R$)'}, inplace=True)
-            
-            # 5. Exportar usando ExcelWriter
-            with pd.ExcelWriter(excel_path, engine='xlsxwriter') as writer:
-                
-                workbook = writer.book
-                # Formato monetário brasileiro
-                money_format = workbook.add_format({'num_format': 'R$ #,##0.00'})
-                
-                # --- Exportar Vendas ---
-                if not df_vendas.empty:
-                    df_vendas.to_excel(writer, sheet_name='Vendas', index=False)
-                    worksheet_vendas = writer.sheets['Vendas']
-                    
-                    # Aplica a formatação de moeda e largura
-                    worksheet_vendas.set_column('F:F', 18, money_format) # Coluna de Valor Unid. (R$)
-                    worksheet_vendas.set_column('H:H', 18, money_format) # Coluna de Preço Final (R$)
-                    
-                    # Ajusta a largura das colunas baseada nos cabeçalhos
-                    for i, col in enumerate(df_vendas.columns):
-                        worksheet_vendas.set_column(i, i, max(len(col) + 2, 12))
-
-
-                # --- Exportar Encomendas ---
-                if not df_enc.empty:
-                    df_enc.to_excel(writer, sheet_name='Encomendas', index=False)
-                    worksheet_enc = writer.sheets['Encomendas']
-                    
-                    # Aplica a formatação de moeda e largura
-                    worksheet_enc.set_column('F:F', 18, money_format) # Valor Unid. (R$)
-                    worksheet_enc.set_column('G:G', 18, money_format) # Valor Total (R$)
-                    
-                    # Ajusta a largura das colunas baseada nos cabeçalhos
-                    for i, col in enumerate(df_enc.columns):
-                        worksheet_enc.set_column(i, i, max(len(col) + 2, 12))
+            # 2. Exportar num arquivo temporário ao lado do destino.
+            # Só substitui a planilha final quando a escrita termina; assim uma falha
+            # no meio (ex.: arquivo aberto no Excel) não deixa um arquivo truncado.
+            base, ext = os.path.splitext(excel_path)
+            tmp_path = f"{base}.tmp{ext}"
+
+            # constant_memory: o xlsxwriter descarrega cada linha no disco assim que a
+            # próxima começa, então a memória usada não cresce com o tamanho das tabelas.
+            import xlsxwriter
+            workbook = xlsxwriter.Workbook(tmp_path, {'constant_memory': True})
+            try:
+                formats = {
+                    'header': workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'}),
+                    'money': workbook.add_format({'num_format': 'R$ #,##0.00'}), # Formato monetário brasileiro
+                }
+                for spec in self.EXPORT_SHEETS:
+                    count, max_lengths = stats[spec[0]]
+                    if count:
+                        self._escrever_aba(workbook, formats, conn, spec, max_lengths)
+            finally:
+                workbook.close()
             
-            # O bloco 'with' garante que o arquivo seja salvo e fechado corretamente.
-            messagebox.showinfo("Sucesso", f"Dados exportados para:\n{excel_path}")
+            os.replace(tmp_path, excel_path)
+            self.root.after(0, lambda: self.mostrar_status(f"Dados exportados para: {excel_path}"))
             
         except PermissionError:
-            messagebox.showerror("Erro de Permissão", f"O arquivo '{os.path.basename(excel_path)}' está aberto ou você não tem permissão. Por favor, feche-o e tente novamente.")
+            msg = f"O arquivo '{os.path.basename(excel_path)}' está aberto ou você não tem permissão. Por favor, feche-o e tente novamente."
+            self.root.after(0, lambda: messagebox.showerror("Erro de Permissão", msg))
         except Exception as e:
-            messagebox.showerror("Erro de Exportação", f"Não foi possível exportar os dados:\n{e}")
+            self.root.after(0, self._show_error, "Erro de Exportação", "Não foi possível exportar os dados.", e)
+        finally:
+            if conn is not None:
+                conn.close()
+            if tmp_path and os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError as e:
+                    print(f"Não foi possível remover o arquivo temporário: {e}")
+            self.root.after(0, self._finalizar_exportacao)
+
+    def _escrever_aba(self, workbook, formats, conn, spec, max_lengths):
+        """Grava uma aba da exportação linha a linha, lendo o cursor do SQLite em lotes."""
+        sheet_name, table, columns, money_columns = spec
+        worksheet = workbook.add_worksheet(sheet_name)
+
+        # Larguras e formatos vêm antes das linhas: no modo constant_memory as linhas
+        # já gravadas não são mais alteradas.
+        for i, ((header, _), max_len) in enumerate(zip(columns, max_lengths)):
+            is_money = header in money_columns
+            width = min(max(len(header), max_len or 0) + 2, 60)
+            worksheet.set_column(i, i, max(width, 18 if is_money else 12), formats['money'] if is_money else None)
+        worksheet.write_row(0, 0, [header for header, _ in columns], formats['header'])
+
+        cursor = conn.execute(f"SELECT {', '.join(expr for _, expr in columns)} FROM {table}")
+        row_idx = 1
+        while True:
+            batch = cursor.fetchmany(10000)
+            if not batch:
+                break
+            for row in batch:
+                worksheet.write_row(row_idx, 0, row)
+                row_idx += 1
 
     def iniciar_importacao(self):
         """Abre o diálogo de arquivo e inicia o processo de importação inteligente."""
@@ -1432,7 +1845,7 @@ class SalesApp:
                 ImportMappingWindow(self, df, self.processar_importacao, initial_mapping=auto_mapping)
 
         except Exception as e:
-            messagebox.showerror("Erro ao Ler Arquivo", f"Não foi possível ler a planilha:\n{e}")
+            self._show_error("Erro ao Ler Arquivo", "Não foi possível ler a planilha.", e)
 
     def tentar_mapeamento_automatico(self, sheet_columns):
         """Tenta mapear automaticamente as colunas da planilha para os campos do sistema."""
@@ -1479,7 +1892,7 @@ class SalesApp:
                 nome_cliente = str(row[system_to_sheet["Nome do Cliente"]])
                 nome_produto = str(row[system_to_sheet["Nome do Produto"]])
                 quantidade = int(row[system_to_sheet["Quantidade"]])
-                preco_unitario = float(str(row[system_to_sheet["Valor por unidade (R$)"]]).replace(",", "."))
+                preco_unitario = _parse_valor(str(row[system_to_sheet["Valor por unidade (R$)"]]))
                 
                 tipo_pagamento = str(row.get(system_to_sheet.get("Tipo de Pagamento"), "Não Informado"))
                 nome_vendedor = str(row.get(system_to_sheet.get("Nome do Vendedor"), "Importado"))
@@ -1501,8 +1914,11 @@ class SalesApp:
             self.root.after(0, lambda p=index+1: progress_bar.config(value=p))
         
         if sales_to_insert:
-            success = self.db_manager.insert_multiple_sales(sales_to_insert)
-            if success:
+            try:
+                self.db_manager.insert_multiple_sales(sales_to_insert)
+            except sqlite3.Error as e:
+                self.root.after(0, lambda e=e: messagebox.showerror("Erro de Banco de Dados", f"Erro ao inserir múltiplas vendas: {e}"))
+            else:
                 self.root.after(0, lambda: messagebox.showinfo("Sucesso", f"{len(sales_to_insert)} registros importados com sucesso!"))
         else:
             self.root.after(0, lambda: messagebox.showwarning("Aviso", "Nenhum registro válido encontrado para importação."))
@@ -1535,45 +1951,220 @@ class SalesApp:
 
     def change_theme(self, event=None):
         selected_theme = self.theme_combobox.get()
+        if selected_theme == self.current_theme_name:
+            return
         self.style.theme_use(selected_theme)
         self.current_theme_name = selected_theme
+        self._register_styles()
         self._save_theme_setting(selected_theme)
-        self.atualizar_tabela()
         self.update_dashboard()
 
     def _load_theme_setting(self):
         try:
-            with open(self.theme_settings_path, 'r') as f:
-                theme = f.read().strip()
+            # Nomes de tema são curtos: não há por que ler mais que alguns bytes
+            with open(self.theme_settings_path, 'r', encoding='utf-8') as f:
+                theme = f.read(32).strip()
             return theme if theme else "cosmo"
-        except FileNotFoundError:
+        except (FileNotFoundError, UnicodeDecodeError):
             return "cosmo"
 
     def _save_theme_setting(self, theme_name):
-        with open(self.theme_settings_path, 'w') as f:
-            f.write(theme_name)
+        # Grava num arquivo temporário e o troca pelo definitivo: uma queda no meio
+        # da escrita nunca deixa o arquivo de tema truncado.
+        tmp_path = self.theme_settings_path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(theme_name)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.theme_settings_path)
+        except OSError as e:
+            print(f"Não foi possível salvar o tema: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def on_search_key_release(self, event=None):
+        """Agenda a pesquisa para 200 ms após a última tecla, evitando uma consulta por tecla."""
+        if self._search_after_id:
+            self.root.after_cancel(self._search_after_id)
+        self._search_after_id = self.root.after(200, self._executar_pesquisa)
+
+    def _executar_pesquisa(self):
+        """
+        Executa a pesquisa agendada. Se o novo termo contém o termo da última consulta SQL,
+        todas as vendas que podem casar já estão na tabela: basta filtrá-las localmente.
+        """
+        self._search_after_id = None
+        search_term = self.search_entry.get().strip()
+        if search_term == self._last_search:
+            return # Teclas que não alteram o termo (setas, Shift...)
+        # O filtro local só é exato se a consulta anterior já trouxe todas as suas vendas
+        # e passou pelo mesmo casamento do filtro local (FTS5 trigram). Termos curtos vão
+        # por LIKE, que só ignora maiúsculas em ASCII: a partir deles, consulta de novo.
+        if (self._tudo_carregado and self._base_search is not None
+                and self.db_manager.uses_fts(self._base_search)
+                and self._base_search.lower() in search_term.lower()):
+            self._filtrar_tabela(search_term)
+        else:
+            self.atualizar_tabela()
+
+    def limpar_pesquisa(self):
+        """Limpa o campo de pesquisa e recarrega a tabela imediatamente."""
+        if self._search_after_id:
+            self.root.after_cancel(self._search_after_id)
+            self._search_after_id = None
+        self.search_entry.delete(0, tk.END)
+        self.atualizar_tabela()
 
     def atualizar_tabela(self):
-        self.tree.delete(*self.tree.get_children())
+        """Recarrega do banco as vendas que casam com o termo de pesquisa e redesenha a tabela."""
+        # Tira a Treeview da tela durante a carga em lote: o layout é refeito uma única
+        # vez ao final, em vez de a cada linha inserida.
+        self.tree.grid_remove()
+        try:
+            self._recarregar_linhas()
+        finally:
+            self.tree.grid()
+
+    def _recarregar_linhas(self):
+        """Descarta as vendas em memória, busca a primeira página da consulta atual e a exibe."""
+        # Apaga também as linhas escondidas (detach) pelo filtro local
+        self.tree.delete(*self._materializados)
+
         search_term = self.search_entry.get().strip()
-        vendas = self.db_manager.fetch_all_sales(search_term)
-        
-        total_geral = 0.0
+        self._last_search = search_term
+        self._base_search = search_term
+        total_geral = self.db_manager.fetch_sales_total(search_term)
+
+        self._all_iids = []
+        self._linhas_vendas = {}
+        self._row_search_blobs = {}
+        self._precos_finais = {}
+        self._row_cache = {}
+        self._menor_id_carregado = None
+        self._tudo_carregado = False
+        self._iids_filtrados = []
+
+        self._atualizar_total(total_geral)
+
+        self._materializados = set()
+        self._exibidos = 0
+        self._exibir_mais_linhas() # Busca a primeira página no banco
+
+    def _carregar_pagina_do_banco(self):
+        """Busca no banco a próxima página da consulta atual e a acrescenta às vendas em memória."""
+        vendas = self.db_manager.fetch_all_sales(self._base_search, limit=self.PAGE_SIZE,
+                                                 before_id=self._menor_id_carregado)
+        if len(vendas) < self.PAGE_SIZE:
+            self._tudo_carregado = True
+        if vendas:
+            self._menor_id_carregado = vendas[-1][0]
+
+        # Os valores formatados ficam em memória; só viram itens da Treeview quando
+        # precisam aparecer (ver _exibir_mais_linhas).
         for venda in vendas:
-            venda_id, data_h, nome_c, nome_p, qtd, preco_u, tipo_p, preco_f, nome_v = venda
-            self.tree.insert('', tk.END, iid=venda_id, values=(
-                data_h, nome_c, nome_p, qtd,
-                f"{preco_u:.2f}".replace(".", ","),
-                tipo_p,
-                f"{preco_f:.2f}".replace(".", ","),
-                nome_v
-            ))
-            total_geral += preco_f
-
-        self.tree.insert('', tk.END, iid=self.TOTAL_ROW_ID, values=(
-            "", "", "", "", "", "", f"TOTAL: {total_geral:.2f}".replace(".",","), ""
-        ), tags=('total_row',))
-        self.tree.tag_configure('total_row', background=self.style.lookup('TFrame', 'background'), font=('Arial', 10, 'bold'))
+            iid = self._guardar_venda(venda)
+            self._all_iids.append(iid)
+            # Enquanto houver páginas no banco não há filtro local: exibe tudo o que chega
+            self._iids_filtrados.append(iid)
+
+    def _guardar_venda(self, venda):
+        """Registra nos caches em memória uma linha no formato de fetch_all_sales e retorna o seu iid."""
+        venda_id, data_h, nome_c, nome_p, qtd, preco_u, tipo_p, preco_f, nome_v = venda
+        iid = str(venda_id)
+        self._linhas_vendas[iid] = (
+            data_h, nome_c, nome_p, qtd,
+            _fmt_decimal(preco_u),
+            tipo_p,
+            _fmt_decimal(preco_f),
+            nome_v
+        )
+        # Guarda o necessário para filtrar localmente sem voltar ao banco
+        self._row_search_blobs[iid] = f"{nome_c}\x1f{nome_p}\x1f{nome_v}".lower()
+        self._precos_finais[iid] = preco_f
+        self._row_cache[iid] = (venda_id, nome_c, nome_p, qtd, preco_u, tipo_p, nome_v)
+        return iid
+
+    def _aplicar_venda_salva(self, venda_id, dados):
+        """Reflete na tabela uma venda recém-gravada (sem pesquisa ativa), sem recarregar as demais."""
+        iid = str(venda_id)
+        edicao = iid in self._precos_finais
+        self._guardar_venda((
+            venda_id, dados["data_hora"], dados["nome_cliente"], dados["nome_produto"], dados["quantidade"],
+            dados["preco"], dados["tipo_pagamento"], dados["preco_final"], dados["nome_vendedor"]
+        ))
+        if edicao:
+            # Edição: só a linha alterada muda
+            if iid in self._materializados:
+                self.tree.item(iid, values=self._linhas_vendas[iid])
+        else:
+            # Nova venda: tem o maior ID, então entra no topo (ordem por ID decrescente)
+            self._all_iids.insert(0, iid)
+            self._iids_filtrados.insert(0, iid)
+            self.tree.insert('', 0, iid=iid, values=self._linhas_vendas[iid])
+            self._materializados.add(iid)
+            self._exibidos += 1
+        # Relê o total no banco (um único SUM; upsert_sale já descartou o cache) em vez
+        # de somar/subtrair o preço ao total exibido, o que acumularia resíduo de float.
+        self._atualizar_total(self.db_manager.fetch_sales_total(self._last_search))
+
+    def _filtrar_tabela(self, search_term):
+        """
+        Filtra as vendas já carregadas sem consultar o banco: todas as linhas são
+        desanexadas (detach) numa única chamada `set_children` e apenas a primeira
+        página das que casam com o termo é reanexada.
+        """
+        self._last_search = search_term
+        # Normalizado uma vez; os blobs já vêm normalizados da carga. lower() (e não casefold())
+        # acompanha o trigram do FTS5, que também não troca 'ß' por 'ss'.
+        termo = search_term.lower()
+        self._iids_filtrados = [iid for iid in self._all_iids if termo in self._row_search_blobs[iid]]
+        self.tree.set_children('')
+        self._exibidos = 0
+        self._exibir_mais_linhas()
+
+        # Linhas escondidas não devem continuar selecionadas (ex.: para exclusão)
+        selecionados = self.tree.selection()
+        if selecionados:
+            visiveis = set(self._iids_filtrados[:self._exibidos])
+            mantidos = [iid for iid in selecionados if iid in visiveis]
+            if len(mantidos) != len(selecionados):
+                self.tree.selection_set(mantidos)
+
+        self._atualizar_total(sum(self._precos_finais[iid] for iid in self._iids_filtrados))
+
+    def _exibir_mais_linhas(self):
+        """Anexa à Treeview a próxima página de vendas filtradas, criando os itens que ainda não existem."""
+        self._carga_pendente = False
+        inicio = self._exibidos
+        if inicio + self.PAGE_SIZE > len(self._iids_filtrados) and not self._tudo_carregado:
+            self._carregar_pagina_do_banco()
+        pagina = self._iids_filtrados[inicio:inicio + self.PAGE_SIZE]
+        # Chama o comando Tcl da Treeview diretamente, sem o wrapper Python de
+        # insert()/move() (que reformata as opções a cada linha). Os iids são str.
+        tk_call, tree_w = self.tree.tk.call, self.tree._w
+        linhas, materializados = self._linhas_vendas, self._materializados
+        for pos, iid in enumerate(pagina, start=inicio):
+            if iid in materializados:
+                tk_call(tree_w, 'move', iid, '', pos) # Reanexa um item desanexado pelo filtro
+            else:
+                tk_call(tree_w, 'insert', '', pos, '-id', iid, '-values', linhas[iid])
+                materializados.add(iid)
+        self._exibidos = inicio + len(pagina)
+
+    def _on_tree_yscroll(self, first, last):
+        """Repassa a rolagem à scrollbar e carrega a próxima página quando o fim da lista se aproxima."""
+        self.scrollbar_vendas.set(first, last)
+        ha_mais = self._exibidos < len(self._iids_filtrados) or not self._tudo_carregado
+        if float(last) > 0.9 and ha_mais and not self._carga_pendente:
+            self._carga_pendente = True
+            self.root.after_idle(self._exibir_mais_linhas)
+
+    def _atualizar_total(self, total_geral):
+        """Atualiza o rótulo de total abaixo da tabela."""
+        self.total_label.configure(text=f"TOTAL: {_fmt_decimal(total_geral)}")
 
     def fechar_app(self):
         self.db_manager.close_connection()
@@ -1658,7 +2249,7 @@ if __name__ == "__main__":
         root.iconbitmap(icon_path_abs) 
 
         # Método avançado para forçar o ícone na barra de tarefas (apenas para Windows)
-        if os.name == 'nt':
+        if _IS_WINDOWS:
             # Força a criação do "handle" da janela no Windows
             root.update()
             